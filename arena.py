@@ -0,0 +1,128 @@
+from constants import FREQUENCY, MAX_TIME
+from utils import Params, SIGNALS
+import graphs_main
+
+from multiprocessing import shared_memory
+import multiprocessing
+import atexit
+import sys
+
+import numpy as np
+
+# This file runs campaigns of simulations on worker processes without sending the results
+# back through pickling: the parent creates a shared memory block (the arena) with the
+# trajectories and the summary metrics of every run, and each worker writes the results of
+# its runs directly at their index. The parent reads the arrays in place (zero copies).
+
+METRICS = ("cost", "done")
+N_STEPS = MAX_TIME * FREQUENCY  # horizon of graphs_main.main
+
+
+class ResultArena:
+    """Shared memory arrays of a campaign: trajectories[run, signal, step] and
+    metrics[run, metric]. The creator owns the block and must unlink it (close
+    does it, also at exit); if the parent is killed, the resource tracker of
+    multiprocessing removes the block. The arrays are views on the block: they
+    must not be used after close (copy what must outlive the arena)"""
+    def __init__(self, n_runs: int, n_steps: int = N_STEPS, name: str = None):
+        self.n_runs = n_runs
+        self.n_steps = n_steps
+        size = 8 * n_runs * (len(SIGNALS) * n_steps + len(METRICS))
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            atexit.register(self.close)
+        else:
+            self.shm = _attach(name)
+        self.trajectories = np.ndarray((n_runs, len(SIGNALS), n_steps), dtype=np.float64, buffer=self.shm.buf)
+        self.metrics = np.ndarray((n_runs, len(METRICS)), dtype=np.float64,
+                                  buffer=self.shm.buf, offset=self.trajectories.nbytes)
+        if self.owner:
+            self.trajectories.fill(np.nan)
+            self.metrics.fill(0)
+
+    @property
+    def spec(self) -> tuple:
+        """What a worker needs to attach to the arena"""
+        return self.shm.name, self.n_runs, self.n_steps
+
+    @classmethod
+    def attach(cls, spec: tuple) -> "ResultArena":
+        name, n_runs, n_steps = spec
+        return cls(n_runs, n_steps, name = name)
+
+    def signal(self, name: str):
+        """View of a signal for all the runs (n_runs x n_steps)"""
+        return self.trajectories[:, SIGNALS.index(name)]
+
+    def metric(self, name: str):
+        return self.metrics[:, METRICS.index(name)]
+
+    def close(self):
+        if self.shm is None:
+            return
+        self.trajectories = self.metrics = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+            atexit.unregister(self.close)
+        self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # Only the creator tracks the block. Spawned workers share the resource tracker of
+    # the parent (before Python 3.13, attaching registers the name again, which is harmless)
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+_worker_arena = None
+
+
+def _init_worker(spec: tuple):
+    global _worker_arena
+    _worker_arena = ResultArena.attach(spec)
+    atexit.register(_worker_arena.close)
+
+
+def _run(index: int, point: tuple):
+    params, windX, windZ = point
+    resp = graphs_main.main(params, plot = False, windX = windX, windZ = windZ,
+                            events = graphs_main.DIVERGENCE)
+    row = _worker_arena.trajectories[index]
+    for i, signal in enumerate(SIGNALS):
+        row[i, :] = getattr(resp, signal)
+    _worker_arena.metrics[index, METRICS.index("cost")] = graphs_main.cost(resp.x + resp.z, resp.x_r + resp.z_r)
+    _worker_arena.metrics[index, METRICS.index("done")] = 1
+
+
+def run_campaign(params: list, winds: list = None, processes: int = None) -> ResultArena:
+    """Simulates every Params of the list (with the corresponding (windX, windZ),
+    if given) on a process pool. The caller owns the returned arena and must close it
+    (e.g. 'with run_campaign(...) as arena:'). It is also closed if a run fails"""
+    winds = winds if winds is not None else [(0, 0)] * len(params)
+    arena = ResultArena(len(params))
+    try:
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(processes, initializer=_init_worker, initargs=(arena.spec,)) as pool:
+            pool.starmap(_run, [(i, (p, *wind)) for i, (p, wind) in enumerate(zip(params, winds))])
+    except BaseException:
+        arena.close()
+        raise
+    return arena
+
+
+if __name__ == "__main__":
+    campaign = [Params(1, omega_x, 0.8, 10, 0.8, 1, 7) for omega_x in range(2, 42, 2)]
+    with run_campaign(campaign) as arena:
+        best = int(np.argmin(arena.metric("cost")))
+        print(f"{int(arena.metric('done').sum())} runs, best omega_x = {campaign[best].omega_x}, "
+              f"cost = {arena.metric('cost')[best]:.2f}, final x = {arena.signal('x')[best, -1]:.2f}")
+    sys.exit()
@@ -8,6 +8,7 @@ HEIGHT = 70
 #  Sample time parameters
 FREQUENCY = 60
 D_TIME = 1.0 / FREQUENCY
+MAX_TIME = 50 # horizon of the simulations of graphs_main, in seconds
 
 # Sprite locations
 BACKGROUND_SPRITE = "sprites/background.jpeg"
@@ -42,3 +43,6 @@ POS_CG = ROCKET_HEIGHT/2
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 RED = (255, 0, 0)
+
+# Startup budget of worker processes (see startup.py)
+WORKER_STARTUP_BUDGET = 0.15  # seconds to import the worker modules
@@ -0,0 +1,76 @@
+from constants import WIDTH, ROCKET_HEIGHT
+
+from math import cos, fabs
+
+# This file handles the events that happen inside an integration step: the contact of the
+# rocket with the ground and its exit from the world bounds. Since the positions move
+# linearly inside a step (with the speeds of its beginning), the exact crossing time
+# can be found and the event is applied at that time, instead of at the end of the step.
+
+ROOT_ITERATIONS = 30  # bisection iterations to locate a ground contact inside a step
+
+
+def ground_clearance(locZ, theta, cos = cos, fabs = fabs):
+    """Distance between the lowest end of the rocket and the ground
+    (with the math functions of the rocket, see Rocket)"""
+    return locZ - fabs(cos(theta))*ROCKET_HEIGHT/2
+
+
+class GroundContact:
+    """Ground at Z = 0. When the rocket hits it, the vertical speed is
+    reversed and multiplied by the restitution coefficient"""
+    def __init__(self, restitution: float = 0.0):
+        self.restitution = restitution
+
+
+class Bounds:
+    """Horizontal limits of the world. The motion is terminated when the rocket leaves them"""
+    def __init__(self, x_min: float = 0, x_max: float = WIDTH):
+        self.x_min = x_min
+        self.x_max = x_max
+
+
+class WorldEvents:
+    """Set of events checked at each step of the rocket motion (see Rocket.move)"""
+    def __init__(self, ground: GroundContact = None, bounds: Bounds = None):
+        self.ground = ground
+        self.bounds = bounds
+
+    def handle(self, rocket, start: tuple, dt: float):
+        """Applies the events that happened during the last step of the rocket.
+        :param start: (locX, locZ, theta, speedX, speedZ, omega) at the beginning of the step"""
+        x0, z0, theta0, vx0, vz0, omega0 = start
+
+        if self.bounds is not None and not (self.bounds.x_min <= rocket.locX <= self.bounds.x_max):
+            bound = self.bounds.x_min if rocket.locX < self.bounds.x_min else self.bounds.x_max
+            s = min(max((bound - x0) / vx0, 0), dt) if vx0 != 0 else 0
+            rocket.locX = x0 + vx0 * s
+            rocket.locZ = z0 + vz0 * s
+            rocket.theta = theta0 + omega0 * s
+            rocket.terminated = True
+            rocket.event_time = s
+            return
+
+        sin, cos, fabs = rocket.sin, rocket.cos, rocket.fabs
+        if self.ground is not None and ground_clearance(rocket.locZ, rocket.theta, cos, fabs) < 0:
+            if ground_clearance(z0, theta0, cos, fabs) <= 0:
+                s = 0
+            else:
+                low, high = 0, dt
+                for _ in range(ROOT_ITERATIONS):
+                    middle = (low + high) / 2
+                    if ground_clearance(z0 + vz0 * middle, theta0 + omega0 * middle, cos, fabs) > 0:
+                        low = middle
+                    else:
+                        high = middle
+                s = high
+                # Newton step from the bracketed root: it refines the contact time and, when
+                # the state carries derivatives (see gradient.py), gives the derivatives of it
+                theta = theta0 + omega0 * s
+                slope = vz0 + (1 if cos(theta) > 0 else -1) * sin(theta) * omega0 * ROCKET_HEIGHT/2
+                if slope < 0:
+                    s = min(max(s - ground_clearance(z0 + vz0 * s, theta, cos, fabs) / slope, low), high)
+            if rocket.speedZ < 0:
+                rocket.speedZ = -self.ground.restitution * rocket.speedZ
+            rocket.locZ = fabs(cos(rocket.theta))*ROCKET_HEIGHT/2 + rocket.speedZ * (dt - s)
+            rocket.event_time = s
@@ -0,0 +1,141 @@
+from constants import FREQUENCY
+from utils import Params, Response, SIGNALS
+import graphs_main
+
+import os
+import sys
+import time
+
+import numpy as np
+
+# This file is a regression harness for the simulation: it records golden trajectories for
+# a matrix of controller parameters, vertical control modes, winds and horizons, and then
+# compares other implementations of the simulation (scalar, batched, compiled...) against
+# them, signal by signal with their own tolerances, reporting the first step where they diverge.
+# Run 'python golden.py record' once (before a change) and 'python golden.py check' after it.
+
+GOLDEN_PATH = "golden/trajectories.npz"
+
+PARAMS = (Params(xi_x = 1, omega_x = 10, xi_theta = 0.8, omega_theta = 10, xi_z = 0.8, omega_z = 1, k_z = 7),
+          Params(xi_x = 0.4, omega_x = 18, xi_theta = 0.3, omega_theta = 8, xi_z = 0.6, omega_z = 2, k_z = 3))
+SPEED_CTRL_MODES = (False, True)
+WINDS = ((0, 0), (5, -2))
+HORIZONS = (10, 50)  # in seconds
+
+# Absolute and relative tolerances of each signal: |new - golden| <= atol + rtol*|golden|
+TOLERANCES = {"x": (1e-9, 1e-9), "x_r": (0, 0), "z": (1e-9, 1e-9), "z_r": (0, 0),
+              "theta": (1e-12, 1e-9), "theta_r": (1e-12, 1e-9), "alpha": (1e-12, 1e-9),
+              "thrust": (1e-6, 1e-9)}
+
+
+def cases() -> list:
+    """Matrix of cases: (name, params, speed_ctrl, (windX, windZ), horizon).
+    Cases that only differ by the horizon share the same name (and golden trajectory)"""
+    return [(f"p{i}-{'speed' if speed_ctrl else 'position'}-w{j}", params, speed_ctrl, wind, horizon)
+            for i, params in enumerate(PARAMS)
+            for speed_ctrl in SPEED_CTRL_MODES
+            for j, wind in enumerate(WINDS)
+            for horizon in HORIZONS]
+
+
+def scalar(params: Params, speed_ctrl: bool, wind: tuple, horizon: int) -> Response:
+    """Reference implementation (graphs_main.main)"""
+    return graphs_main.main(params, plot = False, windX = wind[0], windZ = wind[1],
+                            speed_ctrl = speed_ctrl, max_time = horizon)
+
+
+def dual(params: Params, speed_ctrl: bool, wind: tuple, horizon: int) -> Response:
+    """Automatic differentiation (gradient.py): the simulation runs on dual numbers
+    seeded on every field of Params, and the values of the signals are compared"""
+    from gradient import DualRocket, dual_params, value
+    resp = graphs_main.main(dual_params(params), plot = False, windX = wind[0], windZ = wind[1],
+                            speed_ctrl = speed_ctrl, max_time = horizon, rocket_class = DualRocket)
+    for signal in SIGNALS:
+        setattr(resp, signal, [value(v) for v in getattr(resp, signal)])
+    return resp
+
+
+IMPLEMENTATIONS = {"scalar": scalar, "dual": dual}
+
+
+def as_array(resp: Response) -> np.ndarray:
+    """Signals of a response as a (signal, step) array"""
+    return np.array([getattr(resp, signal) for signal in SIGNALS], dtype=np.float64)
+
+
+def record(path: str = GOLDEN_PATH, implementation = scalar):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Only the longest horizon is stored: the shorter ones are compared with its beginning.
+    # Each signal is stored apart, and the constant ones (the references) as a scalar
+    golden = {}
+    for name, params, speed_ctrl, wind, horizon in cases():
+        if horizon == max(HORIZONS):
+            for signal, values in zip(SIGNALS, as_array(implementation(params, speed_ctrl, wind, horizon))):
+                golden[f"{name}.{signal}"] = values[0] if (values == values[0]).all() else values
+    np.savez_compressed(path, **golden)
+
+
+def load(path: str = GOLDEN_PATH) -> dict:
+    """Reads the golden trajectories recorded by record
+    :return: (signal, step) array of each case name"""
+    n_steps = max(HORIZONS) * FREQUENCY
+    with np.load(path) as data:
+        names = {key.rsplit(".", 1)[0] for key in data.files}
+        return {name: np.array([np.broadcast_to(data[f"{name}.{signal}"], n_steps) for signal in SIGNALS])
+                for name in names}
+
+
+def first_divergence(new: np.ndarray, golden: np.ndarray):
+    """Compares all the signals at once.
+    :return: None if they match, else (step, signal name, new value, golden value)"""
+    if new.shape != golden.shape:
+        step = min(new.shape[1], golden.shape[1])
+        return step, "length", new.shape[1], golden.shape[1]
+    atol = np.array([TOLERANCES[signal][0] for signal in SIGNALS])[:, None]
+    rtol = np.array([TOLERANCES[signal][1] for signal in SIGNALS])[:, None]
+    with np.errstate(invalid="ignore"):
+        bad = ~(np.abs(new - golden) <= atol + rtol * np.abs(golden))
+    bad &= ~(np.isnan(new) & np.isnan(golden))
+    steps = bad.any(axis=0)
+    if not steps.any():
+        return None
+    step = int(np.argmax(steps))
+    i = int(np.argmax(bad[:, step]))
+    return step, SIGNALS[i], float(new[i, step]), float(golden[i, step])
+
+
+def check(implementation = scalar, path: str = GOLDEN_PATH, verbose: bool = True) -> bool:
+    """Runs every case with the implementation and compares it with the golden trajectories
+    :return: True if every case matches"""
+    ok = True
+    golden = load(path)
+    for name, params, speed_ctrl, wind, horizon in cases():
+        if name not in golden:
+            print(f"{name}: no golden trajectory (record again)")
+            ok = False
+            continue
+        reference = golden[name][:, :horizon*FREQUENCY]
+        divergence = first_divergence(as_array(implementation(params, speed_ctrl, wind, horizon)), reference)
+        name = f"{name}-h{horizon}"
+        if divergence is not None:
+            step, signal, new, reference = divergence
+            print(f"{name}: diverges at step {step} (t = {step/FREQUENCY:.3f} s) on {signal}: "
+                  f"{new!r} != {reference!r}")
+            ok = False
+        elif verbose:
+            print(f"{name}: ok")
+    return ok
+
+
+if __name__ == "__main__":
+    # Usage: python golden.py record | check [implementation]
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    start = time.perf_counter()
+    if command == "record":
+        record()
+        print(f"{len(cases())} cases recorded in {time.perf_counter() - start:.2f} s")
+        sys.exit()
+    name = sys.argv[2] if len(sys.argv) > 2 else "scalar"
+    ok = check(IMPLEMENTATIONS[name], verbose = False)
+    print(f"{name}: {'ok' if ok else 'FAILED'} ({len(cases())} cases in {time.perf_counter() - start:.2f} s)")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,154 @@
+from rocket import Rocket
+from utils import Params, PARAM_FIELDS
+
+from math import sin, cos
+import numpy as np
+
+# This file computes the gradient of the simulation cost with respect to the controller
+# parameters by forward mode automatic differentiation: each value carries, besides its
+# value, its derivatives with respect to the differentiated fields of Params (dual numbers).
+# The controllers and the rocket run unchanged on dual numbers: DualRocket only replaces
+# the math functions used by Rocket.move. Only the requested fields are seeded, so the
+# quantities that depend only on the other fields are computed with plain floats.
+
+
+class Dual:
+    """Dual number: value and derivatives (list of floats, never modified in place)
+    with respect to the differentiated parameters. Plain lists are cheaper than numpy
+    arrays for so few derivatives, since every operation creates a new number"""
+    __slots__ = ("val", "der")
+
+    def __init__(self, val: float, der: list):
+        self.val = val
+        self.der = der
+
+    def __add__(self, other):
+        if other.__class__ is Dual:
+            return Dual(self.val + other.val, [d + e for d, e in zip(self.der, other.der)])
+        return Dual(self.val + other, self.der)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if other.__class__ is Dual:
+            return Dual(self.val - other.val, [d - e for d, e in zip(self.der, other.der)])
+        return Dual(self.val - other, self.der)
+
+    def __rsub__(self, other):
+        return Dual(other - self.val, [-d for d in self.der])
+
+    def __mul__(self, other):
+        if other.__class__ is Dual:
+            a, b = self.val, other.val
+            return Dual(a * b, [d * b + e * a for d, e in zip(self.der, other.der)])
+        return Dual(self.val * other, [d * other for d in self.der])
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if other.__class__ is Dual:
+            b = other.val
+            q = self.val / b
+            return Dual(q, [(d - e * q) / b for d, e in zip(self.der, other.der)])
+        return Dual(self.val / other, [d / other for d in self.der])
+
+    def __rtruediv__(self, other):
+        k = -other / (self.val * self.val)
+        return Dual(other / self.val, [d * k for d in self.der])
+
+    def __pow__(self, n):
+        k = n * self.val ** (n - 1)
+        return Dual(self.val ** n, [d * k for d in self.der])
+
+    def __neg__(self):
+        return Dual(-self.val, [-d for d in self.der])
+
+    def __abs__(self):
+        return self if self.val >= 0 else -self
+
+    def __eq__(self, other):
+        return self.val == value(other)
+
+    def __lt__(self, other):
+        return self.val < value(other)
+
+    def __le__(self, other):
+        return self.val <= value(other)
+
+    def __gt__(self, other):
+        return self.val > value(other)
+
+    def __ge__(self, other):
+        return self.val >= value(other)
+
+
+def value(x) -> float:
+    return x.val if x.__class__ is Dual else x
+
+
+def dsin(x):
+    if x.__class__ is Dual:
+        k = cos(x.val)
+        return Dual(sin(x.val), [d * k for d in x.der])
+    return sin(x)
+
+
+def dcos(x):
+    if x.__class__ is Dual:
+        k = -sin(x.val)
+        return Dual(cos(x.val), [d * k for d in x.der])
+    return cos(x)
+
+
+def dual_params(params: Params, fields: tuple = PARAM_FIELDS) -> Params:
+    """Seeds the parameters: each of the given fields is a dual number with a
+    unit derivative, the other ones stay plain floats"""
+    seeded = {field: Dual(float(getattr(params, field)), [float(i == j) for j in range(len(fields))])
+              for i, field in enumerate(fields)}
+    return Params(*(seeded.get(field, getattr(params, field)) for field in PARAM_FIELDS))
+
+
+class DualRocket(Rocket):
+    """Rocket whose motion accepts dual numbers"""
+    sin = staticmethod(dsin)
+    cos = staticmethod(dcos)
+    fabs = staticmethod(abs)
+
+
+def minimize(cost_and_gradient, x0, bounds, iterations: int = 30, tolerance: float = 1e-6) -> tuple:
+    """Small projected BFGS (quasi-Newton) search with backtracking line search.
+    :param cost_and_gradient: function of the parameter vector returning (cost, gradient)
+    :param bounds: array of (min, max) of each parameter
+    :return: best parameter vector, its cost and the number of evaluations"""
+    bounds = np.asarray(bounds, dtype=float)
+    x = np.clip(np.asarray(x0, dtype=float), bounds[:, 0], bounds[:, 1])
+    f, g = cost_and_gradient(x)
+    evaluations = 1
+    H = np.eye(len(x))
+    for _ in range(iterations):
+        direction = -H @ g
+        if g @ direction >= 0:  # not a descent direction: restart from the gradient
+            H = np.eye(len(x))
+            direction = -g
+        step = 1.0
+        # the first trial moves each parameter by at most a tenth of its range
+        step = min(step, 0.1 * np.min((bounds[:, 1] - bounds[:, 0]) / (np.abs(direction) + 1e-300)))
+        while True:
+            x_new = np.clip(x + step * direction, bounds[:, 0], bounds[:, 1])
+            f_new, g_new = cost_and_gradient(x_new)
+            evaluations += 1
+            if f_new < f or step < 1e-8:
+                break
+            step /= 2
+        if f_new >= f:
+            break
+        s, y = x_new - x, g_new - g
+        if s @ y > 1e-12:
+            rho = 1 / (s @ y)
+            I = np.eye(len(x))
+            H = (I - rho * np.outer(s, y)) @ H @ (I - rho * np.outer(y, s)) + rho * np.outer(s, s)
+        converged = abs(f - f_new) <= tolerance * abs(f)
+        x, f, g = x_new, f_new, g_new
+        if converged:
+            break
+    return x, f, evaluations
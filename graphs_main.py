@@ -2,17 +2,23 @@ from constants import *
 from math import fabs, sin, cos
 from rocket import Rocket
 from control import FullPIDController, FullPDController
-from utils import Params, Response
-import matplotlib.pyplot as plt
-from cmaes import CMA
-import numpy as np
+from utils import Params, Response, PARAM_FIELDS
+from plotting import PlotWorker
+from events import WorldEvents, GroundContact, Bounds
 import sys
 
 # The following file is responsible to perform an optimization search to minimize
 # the error of a controller, based on the parameters xi and omega of all the loops.
-# It uses CMAes to do the search.
+# It uses CMAes to do the search (or, with --gradient, a quasi-Newton search, see gradient.py,
+# or, with --surrogate, CMAes assisted by a surrogate model, see surrogate.py).
+# Plotting and optimizer libraries are only imported when needed, so worker processes
+# that call 'main' start quickly.
 SPEED_CTRL = False # if True, the controller will control speed, else, it will control
                    # the vertical position instead.
+DIVERGENCE = WorldEvents(bounds = Bounds(-WIDTH, 2*WIDTH)) # ends the runs that go far away
+GROUND = WorldEvents(ground = GroundContact(), bounds = Bounds(-WIDTH, 2*WIDTH)) # same, with the ground
+SEARCH_EVENTS = DIVERGENCE # events of the searches. The ground is opt-in (--ground), since the
+                           # rocket starts below it (at Z = 0)
 
 def cost(actual: list, reference: list):
     if len(actual) != len(reference):
@@ -23,29 +29,49 @@ def cost(actual: list, reference: list):
     return s
 
 
-def main(params: Params, plot: bool) -> Response:
+def cost_and_gradient(params: Params, windX: float = 0, windZ: float = 0, fields: tuple = None,
+                      events: WorldEvents = None) -> tuple:
+    """Cost of the simulation (same as cost applied to the response of main) and its
+    gradient with respect to the given fields of Params (all seven by default),
+    by automatic differentiation
+    :return: cost and gradient (numpy array in the order of the fields)"""
+    from gradient import DualRocket, dual_params
+    import numpy as np
+    fields = fields if fields is not None else PARAM_FIELDS
+    resp = main(dual_params(params, fields), plot = False, windX = windX, windZ = windZ, events = events,
+                rocket_class = DualRocket)
+    value = cost(resp.x + resp.z, resp.x_r + resp.z_r)
+    return value.val, np.array(value.der)
+
+
+def main(params: Params, plot: bool, plotter: PlotWorker = None,
+         windX: float = 0, windZ: float = 0, events: WorldEvents = None,
+         rocket_class: type = Rocket, speed_ctrl: bool = None, max_time: int = MAX_TIME) -> Response:
     """Performs a simulation controlled by the user,
-    so the rocket dynamics can be tested and explored"""
-    windZ = 0
-    windX = 0
+    so the rocket dynamics can be tested and explored.
+    If the events terminate the motion, the last sample is repeated
+    until the end of the horizon, so the cost still penalises the run.
+    speed_ctrl defaults to SPEED_CTRL and max_time is the horizon in seconds"""
+    if speed_ctrl is None:
+        speed_ctrl = SPEED_CTRL
     speed = FullPIDController(D_TIME, 0, MAX_THRUST)
     pos = FullPDController(D_TIME, pi/90)
     theta = FullPDController(D_TIME, MAX_NOZZLE_ANGLE)
-    rocket = Rocket(locX = 0)
+    rocket = rocket_class(locX = 0)
     rocket.set_controllers(speed_ctrl = speed, position_ctrl = pos,
-                           theta_ctrl = theta, speedCtrl = SPEED_CTRL)
+                           theta_ctrl = theta, speedCtrl = speed_ctrl)
     rocket.set_control_params(params)
     rocket.playable = False
 
     resp = Response()
     
-    max_time = 50
     XR = 40
     Z_input = 50
     
-    for i in range(max_time*FREQUENCY):
+    n_steps = max_time*FREQUENCY
+    for i in range(n_steps):
         t = rocket.applyCommand(Z_input, XR, windX, windZ)
-        rocket.move(windX, windZ)
+        rocket.move(windX, windZ, events)
         
         resp.theta_r.append(t)
         resp.alpha.append(rocket.nozzleAngle)
@@ -53,78 +79,79 @@ def main(params: Params, plot: bool) -> Response:
         resp.x_r.append(XR)
         resp.x.append(rocket.locX)
         resp.theta.append(rocket.theta)
-        if SPEED_CTRL:
+        if speed_ctrl:
             resp.z.append(rocket.speedZ)
         else:
             resp.z.append(rocket.locZ)
         resp.z_r.append(Z_input)
 
+        if rocket.terminated:
+            for signal in vars(resp).values():
+                signal.extend([signal[-1]] * (n_steps - i - 1))
+            break
+
     if plot:
-# Sample data (replace with actual data)
-        t = [i*D_TIME for i in range(len(resp.x))]  # Time
-
-        plt.figure(figsize=(6, 10))
-# Plot 1: x_r and x vs t
-        plt.subplot(3, 1, 1)
-        plt.plot(t, resp.x_r, label="x_r", color="red")
-        plt.plot(t, resp.x, label="x", color="blue")
-        plt.ylabel("X Position (m)")
-        plt.legend()
-        plt.grid()
-
-# Plot 2: theta_r and theta vs t
-        plt.subplot(3, 1, 2)
-        plt.plot(t, resp.theta_r, label="theta_r", color="red")
-        plt.plot(t, resp.theta, label="theta", color="blue")
-        plt.ylabel("Orientation (radians)")
-        plt.legend()
-        plt.grid()
-
-# Plot 3: alpha vs t
-        plt.subplot(3, 1, 3)
-        plt.plot(t, resp.alpha, label="Alpha", color="black")
-        plt.xlabel("Time (s)")
-        plt.ylabel("Alpha (radians)")
-        plt.grid()
-# Adjust layout and show the plots
-        plt.tight_layout()
-        plt.savefig('output/X_opt.eps', format='eps')
-        plt.show()
-
-# Plot 1: z vs t
-        plt.figure(figsize=(6, 10))
-        label = "Z speed" if SPEED_CTRL else "Z position"
-        plt.subplot(2, 1, 1)
-        plt.plot(t, resp.z, label=label, color = "blue")
-        plt.plot(t, resp.z_r, label="Reference" + label, color = 'red')
-        plt.title(label)
-        plt.ylabel("Z speed (m/s)" if SPEED_CTRL else "Z position (m)")
-        plt.grid()
-
-# Plot 2: thrust vs t
-        plt.subplot(2, 1, 2)
-        plt.plot(t, resp.thrust, label="Thrust", color="black")
-        plt.xlabel("Time (s)")
-        plt.ylabel("Thrust (N)")
-        plt.grid()
-# Adjust layout and show the plots
-        plt.tight_layout()
-        plt.savefig('output/Z_opt.eps', format='eps')
-        plt.show()
+        own_plotter = plotter is None
+        if own_plotter:
+            plotter = PlotWorker()
+        plotter.submit(resp, 'output/X_opt', 'output/Z_opt', speed_ctrl)
+        if own_plotter:
+            plotter.close(wait = False)
 
     return resp
 
+def gradient_search(initial, bounds):
+    """Quasi-Newton search on the same 4 params as the CMAes search,
+    using the gradient given by automatic differentiation"""
+    from gradient import minimize
+
+    fields = ("xi_x", "omega_x", "xi_theta", "omega_theta")
+
+    def cost_grad(x):
+        return cost_and_gradient(Params(*x, 0.8, 1, 7), fields = fields, events = SEARCH_EVENTS)
+
+    x_min, value, evaluations = minimize(cost_grad, initial, bounds)
+    print(f"{evaluations} evaluations, cost = {value}")
+    return x_min
+
+def surrogate_search(initial, bounds):
+    """CMAes search in which a surrogate model avoids simulating the
+    least promising candidates (see surrogate.py)"""
+    from surrogate import surrogate_search as search
+
+    def simulated_cost(x):
+        resp = main(Params(*x, 0.8, 1, 7), plot = False, events = SEARCH_EVENTS)
+        return cost(resp.x + resp.z, resp.x_r + resp.z_r)
+
+    x_min, value, simulations, saved = search(simulated_cost, initial, bounds)
+    print(f"{simulations} simulations, {saved} saved by the surrogate, cost = {value}")
+    return x_min
+
 if __name__ == "__main__":
+    from cmaes import CMA
+    import numpy as np
     # initial values (input) for the optimization algorithm
     initial = np.array([1, 10, 0.8, 10]) # only 4 params (only testing horizontal position)
     bounds = np.array([[0.1, 1], [1, 50], [0.1, 1], [1, 50]])
+    if "--ground" in sys.argv:
+        SEARCH_EVENTS = GROUND
+    if "--gradient" in sys.argv or "--surrogate" in sys.argv:
+        if "--gradient" in sys.argv:
+            x_min = gradient_search(initial, bounds)
+        else:
+            x_min = surrogate_search(initial, bounds)
+        print("\n\n\n\n\n\n", x_min)
+        plotter = PlotWorker()
+        main(Params(*x_min, 0.8, 1, 7), plot = True, plotter = plotter)
+        plotter.close()
+        sys.exit()
     opt = CMA(mean = initial, bounds = bounds, sigma = 1.3)
     for generation in range(100):
             solutions = []
             for _ in range(opt.population_size):
                 x = opt.ask()
                 params = Params(*x, 0.8, 1, 7)
-                resp = main(params, plot = False)
+                resp = main(params, plot = False, events = SEARCH_EVENTS)
                 value = cost(resp.x + resp.z, resp.x_r + resp.z_r)
                 solutions.append((x, value))
                 print(f"#{generation} {value}")
@@ -134,12 +161,14 @@ if __name__ == "__main__":
     for _ in range(opt.population_size):
         x = opt.ask()
         params = Params(*x, 0.8, 1, 7)
-        resp = main(params, plot = False)
+        resp = main(params, plot = False, events = SEARCH_EVENTS)
         value = cost(resp.x + resp.z, resp.x_r + resp.z_r)
         if value < min:
             min = value
             x_min = x
     print("\n\n\n\n\n\n", x_min)
     params = Params(*x_min, 0.8, 1, 7)
-    main(params, plot = True)
+    plotter = PlotWorker()
+    main(params, plot = True, plotter = plotter)
+    plotter.close()  # the graphs are drawn before exiting
     sys.exit()
@@ -0,0 +1,173 @@
+from constants import FREQUENCY
+from rocket import Rocket
+from world import spawn_rocket, step_world
+
+from array import array
+from bisect import bisect_right
+import struct
+import sys
+
+# This file records the user commands of an interactive session (see playable_main.py),
+# so the flight can be replayed headless, at maximum speed, and analysed afterwards.
+# Only one byte of commands is stored per tick, the wind is stored only when it changes
+# and snapshots of the rocket (keyframes) are taken periodically to allow fast seeking.
+
+# Command flags (one bit per command applied in a tick)
+THRUST_UP = 1
+THRUST_DOWN = 2
+TURN_LEFT = 4
+TURN_RIGHT = 8
+RESET = 16
+
+KEYFRAME_INTERVAL = 10 * FREQUENCY  # ticks between two consecutive keyframes
+STATE_FIELDS = ("locX", "locZ", "theta", "speedX", "speedZ", "omega", "thrust", "nozzleAngle")
+
+_MAGIC = b"RJNL"
+_VERSION = 1
+_HEADER = struct.Struct("<4sBBIIII")
+_WIND = struct.Struct("<Idd")
+_KEYFRAME = struct.Struct("<I" + "d"*len(STATE_FIELDS))
+
+
+def snapshot(rocket: Rocket) -> tuple:
+    """Returns the state of the rocket that is needed to resume its motion"""
+    return tuple(getattr(rocket, field) for field in STATE_FIELDS)
+
+
+def restore(state: tuple) -> Rocket:
+    """Creates a (user controlled) rocket from a snapshot"""
+    rocket = Rocket()
+    for field, value in zip(STATE_FIELDS, state):
+        setattr(rocket, field, value)
+    return rocket
+
+
+def apply_commands(rocket: Rocket, flags: int) -> Rocket:
+    """Applies the commands of a tick to the rocket, in the same order
+    as playable_main does.
+    :return: the rocket after the commands (a new one if it was reset)"""
+    if flags & THRUST_UP:
+        rocket.increaseThrust()
+    if flags & TURN_LEFT:
+        rocket.turnLeft()
+    if flags & TURN_RIGHT:
+        rocket.turnRight()
+    if flags & THRUST_DOWN:
+        rocket.decreaseThrust()
+    if flags & RESET:
+        rocket = spawn_rocket()
+    return rocket
+
+
+class Journal:
+    """Per tick log of the commands and wind of an interactive session.
+    Each tick is recorded as: begin_tick (before the rocket moves) and
+    log_commands (after the user input has been read)"""
+    def __init__(self, ground_physics: bool = True, keyframe_interval: int = KEYFRAME_INTERVAL):
+        self.ground_physics = ground_physics
+        self.keyframe_interval = keyframe_interval
+
+        self.commands = array("B")
+        self.wind = []       # (tick, windX, windZ), only when the wind changes
+        self.keyframes = []  # (tick, snapshot) of the rocket at the beginning of the tick
+
+    def __len__(self):
+        return len(self.commands)
+
+    def begin_tick(self, rocket: Rocket, windX: float, windZ: float):
+        tick = len(self.commands)
+        if tick % self.keyframe_interval == 0:
+            self.keyframes.append((tick, snapshot(rocket)))
+        if not self.wind or self.wind[-1][1:] != (windX, windZ):
+            self.wind.append((tick, windX, windZ))
+
+    def log_commands(self, flags: int):
+        self.commands.append(flags)
+
+    def wind_at(self, tick: int) -> tuple:
+        index = bisect_right(self.wind, tick, key=lambda entry: entry[0]) - 1
+        if index < 0:
+            return (0, 0)
+        return self.wind[index][1:]
+
+    def save(self, path: str):
+        with open(path, "wb") as file:
+            file.write(_HEADER.pack(_MAGIC, _VERSION, self.ground_physics, self.keyframe_interval,
+                                    len(self.commands), len(self.wind), len(self.keyframes)))
+            file.write(self.commands.tobytes())
+            for entry in self.wind:
+                file.write(_WIND.pack(*entry))
+            for tick, state in self.keyframes:
+                file.write(_KEYFRAME.pack(tick, *state))
+
+    @classmethod
+    def load(cls, path: str) -> "Journal":
+        with open(path, "rb") as file:
+            data = file.read()
+        magic, version, ground_physics, interval, n_ticks, n_wind, n_keys = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise Exception(f"{path} is not a journal of version {_VERSION}")
+
+        journal = cls(bool(ground_physics), interval)
+        offset = _HEADER.size
+        journal.commands.frombytes(data[offset:offset + n_ticks])
+        offset += n_ticks
+        for _ in range(n_wind):
+            journal.wind.append(_WIND.unpack_from(data, offset))
+            offset += _WIND.size
+        for _ in range(n_keys):
+            entry = _KEYFRAME.unpack_from(data, offset)
+            journal.keyframes.append((entry[0], entry[1:]))
+            offset += _KEYFRAME.size
+        return journal
+
+
+class Replay:
+    """Headless replay of a journal. The rocket follows exactly the
+    recorded flight, since the physics is deterministic"""
+    def __init__(self, journal: Journal):
+        self.journal = journal
+        self.tick = 0
+        self.rocket = restore(journal.keyframes[0][1]) if journal.keyframes else spawn_rocket(on_ground=False)
+
+    def step(self):
+        """Replays one tick of the journal"""
+        windX, windZ = self.journal.wind_at(self.tick)
+        self.rocket = step_world(self.rocket, windX, windZ, self.journal.ground_physics)
+        self.rocket = apply_commands(self.rocket, self.journal.commands[self.tick])
+        self.tick += 1
+
+    def seek(self, tick: int) -> Rocket:
+        """Moves the replay to the beginning of a given tick, restoring the closest
+        previous keyframe (unless the current position is closer) and replaying from it"""
+        tick = min(max(tick, 0), len(self.journal))
+        keyframes = self.journal.keyframes
+        index = bisect_right(keyframes, tick, key=lambda entry: entry[0]) - 1
+        if index >= 0 and not (keyframes[index][0] <= self.tick <= tick):
+            self.tick = keyframes[index][0]
+            self.rocket = restore(keyframes[index][1])
+        elif self.tick > tick:
+            self.tick = 0
+            self.rocket = spawn_rocket(on_ground=False)
+        while self.tick < tick:
+            self.step()
+        return self.rocket
+
+    def run(self, callback = None) -> Rocket:
+        """Replays the journal until its end. If given, callback(tick, rocket)
+        is called after every tick (e.g. to analyse or render the flight)"""
+        while self.tick < len(self.journal):
+            self.step()
+            if callback is not None:
+                callback(self.tick, self.rocket)
+        return self.rocket
+
+
+if __name__ == "__main__":
+    # Usage: python journal.py <journal file> [tick]
+    journal = Journal.load(sys.argv[1])
+    replay = Replay(journal)
+    rocket = replay.seek(int(sys.argv[2])) if len(sys.argv) > 2 else replay.run()
+    print(f"tick = {replay.tick}/{len(journal)}, " +
+          ", ".join(f"{field} = {value:.4f}" for field, value in zip(STATE_FIELDS, snapshot(rocket))))
+    sys.exit()
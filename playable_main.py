@@ -1,21 +1,42 @@
 from constants import *
 from simulation import Simulation
 from control import FullPIDController, FullPDController
+from journal import Journal, apply_commands
+from journal import THRUST_UP, THRUST_DOWN, TURN_LEFT, TURN_RIGHT, RESET
 import pygame
 import sys
 
 # This file simulates a rocket controlled by the user, using the WASD ou arrow keys
+# If a file name is given as argument, the session is recorded to it (see journal.py)
 
-def main():
+def read_commands() -> int:
+    """Translates the pressed keys into the command flags of the journal"""
+    keys = pygame.key.get_pressed()
+    flags = 0
+    if keys[pygame.K_w] or keys[pygame.K_UP]:
+        flags |= THRUST_UP
+    if keys[pygame.K_a] or keys[pygame.K_LEFT]:
+        flags |= TURN_LEFT
+    if keys[pygame.K_d] or keys[pygame.K_RIGHT]:
+        flags |= TURN_RIGHT
+    if keys[pygame.K_s] or keys[pygame.K_DOWN]:
+        flags |= THRUST_DOWN
+    if keys[pygame.K_r]:
+        flags |= RESET
+    return flags
+
+def main(record: str = None):
     """Performs a simulation controlled by the user,
     so the rocket dynamics can be tested and explored"""
     sim = Simulation()
+    journal = Journal(ground_physics = sim.ground_physics)
     windZ = 0
     windX = 0
     run = True
 
     while run:
         pygame.time.Clock().tick(FREQUENCY)
+        journal.begin_tick(sim.rocket, windX, windZ)
         sim.setWind(windX, windZ)
         sim.update()
 
@@ -23,19 +44,14 @@ def main():
             if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
                 run = False
 
-        keys = pygame.key.get_pressed()
+        flags = read_commands()
+        journal.log_commands(flags)
+        sim.rocket = apply_commands(sim.rocket, flags)
 
-        if keys[pygame.K_w] or keys[pygame.K_UP]:
-            sim.rocket.increaseThrust()
-        if keys[pygame.K_a] or keys[pygame.K_LEFT]:
-            sim.rocket.turnLeft()
-        if keys[pygame.K_d] or keys[pygame.K_RIGHT]:
-            sim.rocket.turnRight()
-        if keys[pygame.K_s] or keys[pygame.K_DOWN]:
-            sim.rocket.decreaseThrust()
-        if keys[pygame.K_r]:
-            sim.reset()
+    if record is not None:
+        journal.save(record)
+    return journal
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
     sys.exit()
@@ -0,0 +1,175 @@
+from constants import D_TIME
+from utils import Response
+
+import multiprocessing
+import multiprocessing.util
+import atexit
+import os
+import sys
+import traceback
+
+# This file generates the graphs of the simulations in a separate worker process,
+# so the simulation loop never waits for matplotlib. The worker uses the headless Agg
+# backend and the long trajectories are decimated (min/max per bucket) before being
+# sent to it, which keeps both the transfer and the rendering cheap.
+
+MAX_POINTS = 2000  # maximum number of points per plotted signal
+PLOT_FORMAT = "png"
+
+
+def decimate(t: list, y: list, max_points: int = MAX_POINTS) -> tuple:
+    """Min/max decimation: splits the signal in buckets and keeps only the minimum and
+    the maximum of each one (in time order), so peaks are preserved on the graph.
+    :return: the decimated time and signal lists"""
+    n = len(y)
+    if n <= max_points:
+        return list(t), list(y)
+    buckets = max_points // 2
+    t_out, y_out = [], []
+    for b in range(buckets):
+        start = b * n // buckets
+        end = (b + 1) * n // buckets
+        i_min = min(range(start, end), key=y.__getitem__)
+        i_max = max(range(start, end), key=y.__getitem__)
+        for i in sorted((i_min, i_max)) if i_min != i_max else (i_min,):
+            t_out.append(t[i])
+            y_out.append(y[i])
+    return t_out, y_out
+
+
+def response_figures(resp: Response, speed_ctrl: bool, max_points: int = MAX_POINTS) -> tuple:
+    """Describes the two graphs of a simulation (horizontal and vertical motion)
+    as plain data. Each figure is a list of subplots, and each subplot is a
+    tuple (ylabel, title, list of (t, y, label, color) curves)"""
+    t = [i*D_TIME for i in range(len(resp.x))]
+
+    def curve(y, label, color):
+        return (*decimate(t, y, max_points), label, color)
+
+    x_figure = [
+        ("X Position (m)", None, [curve(resp.x_r, "x_r", "red"), curve(resp.x, "x", "blue")]),
+        ("Orientation (radians)", None, [curve(resp.theta_r, "theta_r", "red"),
+                                         curve(resp.theta, "theta", "blue")]),
+        ("Alpha (radians)", None, [curve(resp.alpha, None, "black")]),
+    ]
+    label = "Z speed" if speed_ctrl else "Z position"
+    z_figure = [
+        ("Z speed (m/s)" if speed_ctrl else "Z position (m)", label,
+         [curve(resp.z, None, "blue"), curve(resp.z_r, None, "red")]),
+        ("Thrust (N)", None, [curve(resp.thrust, None, "black")]),
+    ]
+    return x_figure, z_figure
+
+
+def draw_figure(figure: list, path: str):
+    """Renders a figure described by response_figures into a file"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(len(figure), 1, figsize=(6, 10))
+    for ax, (ylabel, title, curves) in zip(axes, figure):
+        for t, y, label, color in curves:
+            ax.plot(t, y, label=label, color=color)
+        if any(label is not None for _, _, label, _ in curves):
+            ax.legend()
+        if title is not None:
+            ax.set_title(title)
+        ax.set_ylabel(ylabel)
+        ax.grid()
+    axes[-1].set_xlabel("Time (s)")
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+_detached = []  # workers closed without waiting, with their queues
+
+
+def _release(process, queue):
+    """Once the worker has stopped: if it died before reading all its queue, the data
+    still waiting in the pipe will never be read, so exiting must not wait to send it"""
+    if process.exitcode != 0:
+        queue.cancel_join_thread()
+
+
+def _join_detached():
+    """Waits for the workers closed without waiting. At exit, multiprocessing removes the
+    semaphores of the queues before joining the children, so a worker that has not read
+    its queue yet would fail. atexit runs the last registered function first, so this
+    runs before the exit function of multiprocessing (registered by multiprocessing.util)"""
+    while _detached:
+        process, queue = _detached.pop()
+        process.join()
+        _release(process, queue)
+
+
+atexit.register(_join_detached)
+
+
+def _worker(queue):
+    while True:
+        job = queue.get()
+        if job is None:
+            break
+        for figure, path in job:
+            # an error must not stop the worker: the parent waits for it to read its queue
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                draw_figure(figure, path)
+            except Exception:
+                print(f"Could not draw {path}:", file=sys.stderr)
+                traceback.print_exc()
+
+
+class PlotWorker:
+    """Background process that draws the graphs of the simulations.
+    submit only queues the (decimated) data, so it never blocks the caller"""
+    def __init__(self, fmt: str = PLOT_FORMAT, max_points: int = MAX_POINTS):
+        self.fmt = fmt
+        self.max_points = max_points
+        self.process = None
+        self.queue = None
+
+    def start(self):
+        # spawn (instead of fork) so the worker does not inherit the state of the parent
+        # (e.g. an initialised pygame display). Note that the child still re-imports the
+        # entry point module (as __mp_main__), so its top level imports run again there
+        context = multiprocessing.get_context("spawn")
+        self.queue = context.Queue()
+        self.process = context.Process(target=_worker, args=(self.queue,), daemon=False)
+        self.process.start()
+
+    def submit(self, resp: Response, x_path: str, z_path: str, speed_ctrl: bool):
+        """Queues the graphs of a simulation to be saved at x_path and z_path
+        (without extension, which is given by the format of the worker)"""
+        if self.process is not None and not self.process.is_alive():
+            # the worker died: replace it
+            self.process.join()
+            _release(self.process, self.queue)
+            self.process = None
+        if self.process is None:
+            self.start()
+        x_figure, z_figure = response_figures(resp, speed_ctrl, self.max_points)
+        self.queue.put([(x_figure, f"{x_path}.{self.fmt}"), (z_figure, f"{z_path}.{self.fmt}")])
+
+    def close(self, wait: bool = True):
+        """Stops the worker once all the queued graphs are drawn. With wait = False
+        it returns at once, and the worker is joined at the latest when the
+        interpreter exits (see _join_detached)"""
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            self.queue.put(None)
+        if wait:
+            self.process.join()
+            _release(self.process, self.queue)
+        else:
+            # the queue must outlive this object until the worker has read it
+            for process, queue in [entry for entry in _detached if not entry[0].is_alive()]:
+                _detached.remove((process, queue))
+                process.join()
+                _release(process, queue)
+            _detached.append((self.process, self.queue))
+        self.process = None
+        self.queue = None
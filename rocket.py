@@ -3,15 +3,26 @@ from constants import D_THRUST, MAX_THRUST, D_NOZZLE_ANGLE, MAX_NOZZLE_ANGLE, PO
 from constants import AIR_RES_X, AIR_RES_Z, ROCKET_MASS, GRAVITY, INERTIA, D_TIME, INERTIA_NOZZLE
 from constants import THRUST_THRESHOLD
 from math import cos, sin, pi, fabs, sqrt, tan
-from control import FullPIDController, FullPDController
+from typing import TYPE_CHECKING
 
+if TYPE_CHECKING:
+    # Only needed for the type hints, so importing the rocket stays cheap
+    from control import FullPIDController, FullPDController
+    from events import WorldEvents
 
-def windForce(k, w, v):
+
+def windForce(k, w, v, fabs = fabs):
     return k*(w-v)*fabs(w-v)
 
 
 class Rocket:
     """Rocket implementation class"""
+    # Math functions of the motion. Subclasses may replace them, e.g. by versions
+    # that also propagate derivatives (see gradient.py)
+    sin = staticmethod(sin)
+    cos = staticmethod(cos)
+    fabs = staticmethod(fabs)
+
     def __init__(self, locX: float = 0, locZ: float = 0, theta: float = 0,
                        speedX: float = 0, speedZ: float = 0, omega: float = 0):
         """Initialization method. It generates a car in a
@@ -34,9 +45,14 @@ class Rocket:
         self.playable: bool = True
         self.nozzleAngle: float = 0
 
-    def set_controllers(self, speed_ctrl: FullPIDController,
-                        position_ctrl: FullPDController,
-                        theta_ctrl = FullPDController,
+        # Set by the events applied during the motion (see events.py): event_time is the
+        # time of the event inside the last step (None if no event happened in it)
+        self.terminated: bool = False
+        self.event_time: float = None
+
+    def set_controllers(self, speed_ctrl: "FullPIDController",
+                        position_ctrl: "FullPDController",
+                        theta_ctrl: "FullPDController",
                         speedCtrl: bool = True):
         self.speed_controller = speed_ctrl
         self.position_controller = position_ctrl
@@ -121,23 +137,27 @@ class Rocket:
             self.thrust = self.speed_controller.control(vz, self.locZ)
         return theta_r
 
-    def move(self, windX, windZ, verbose = False):
-        if verbose:
-            print(f'X = {self.locX:.2f}, Z = {self.locZ:.2f}, theta = {self.theta*180/pi:.2f}, nozzle = {self.nozzleAngle*180/pi:.2f}, T = {self.thrust:.2f}, sx = {self.speedX:.2f}, sz = {self.speedZ:.2f}, omega = {self.omega*pi/180:.2f}')
-        self.locX += self.speedX * D_TIME
-        self.locZ += self.speedZ * D_TIME
-        self.theta += self.omega * D_TIME
+    def move(self, windX, windZ, events: "WorldEvents" = None, dt: float = D_TIME):
+        """Integrates the motion of the rocket during dt. If given, the events
+        (ground contact, world bounds) are applied at their exact time in the step"""
+        self.event_time = None
+        if events is not None:
+            start = (self.locX, self.locZ, self.theta, self.speedX, self.speedZ, self.omega)
+        self.locX += self.speedX * dt
+        self.locZ += self.speedZ * dt
+        self.theta += self.omega * dt
         
-        windForceX: float = windForce(AIR_RES_X, windX, self.speedX)
-        windForceZ: float = windForce(AIR_RES_Z, windZ, self.speedZ)
+        sin, cos, fabs = self.sin, self.cos, self.fabs
+        windForceX: float = windForce(AIR_RES_X, windX, self.speedX, fabs)
+        windForceZ: float = windForce(AIR_RES_Z, windZ, self.speedZ, fabs)
 
         forceX: float = windForceX + self.thrust * sin(self.theta + self.nozzleAngle)
         forceZ: float = windForceZ + self.thrust * cos(self.theta + self.nozzleAngle) - ROCKET_MASS*GRAVITY
         torque: float = (POS_CG - POS_CM) * (windForceX * cos(self.theta) - windForceZ * sin(self.theta)) - self.thrust * POS_CM * sin(self.nozzleAngle)
 
-        self.speedX += forceX / ROCKET_MASS * D_TIME
-        self.speedZ += forceZ / ROCKET_MASS * D_TIME
-        self.omega += torque / INERTIA * D_TIME
+        self.speedX += forceX / ROCKET_MASS * dt
+        self.speedZ += forceZ / ROCKET_MASS * dt
+        self.omega += torque / INERTIA * dt
         
         if self.playable:
             # The steering wheel inertia is only applied under user control in order to
@@ -151,3 +171,6 @@ class Rocket:
             self.speedX = 0
         if fabs(self.speedZ) < eps:
             self.speedZ = 0
+
+        if events is not None:
+            events.handle(self, start, dt)
@@ -1,5 +1,4 @@
 from constants import *
-from rocket import Rocket
 
 from utils import clip
 
@@ -8,8 +7,8 @@ from pygame.transform import scale, rotate, flip
 from pygame.image import load
 from pygame.locals import *
 
-from math import pi, sin, cos, fabs
-from rocket import Rocket
+from math import pi, sin, cos
+from world import spawn_rocket, step_world
 
 
 class Simulation:
@@ -24,7 +23,7 @@ class Simulation:
         self.fire_sprite = flip(scale(load(FIRE_SPRITE), (FIRE_WIDTH*M2P, FIRE_HEIGHT*M2P)), False, True)
         self.ground_sprite = scale(load(GROUND_SPRITE), (WIDTH*M2P, HEIGHT*M2P/2))
         
-        self.rocket = Rocket(locX=WIDTH/2)
+        self.rocket = spawn_rocket(on_ground=False)
         self.ground_physics = ground_physics
 
         self.reference_points = [] # reference points (xr) to show on screen 
@@ -41,7 +40,7 @@ class Simulation:
         self.update_check = 0
 
     def reset(self):
-        self.rocket = Rocket(locX=WIDTH/2, locZ=ROCKET_HEIGHT/2)
+        self.rocket = spawn_rocket()
 
     def setWind(self, x, z):
         self.windX = x
@@ -96,7 +95,7 @@ class Simulation:
         if len(self.reference_points) > self.max_ref:
             del self.reference_points[0]
 
-    def update(self, verbose = False):
+    def update(self):
         self.screen.fill(BLACK)
         if self.draw_roc:
             self.rocket_points.append((self.rocket.locX, self.rocket.locZ))
@@ -104,10 +103,5 @@ class Simulation:
                 del self.rocket_points[0]
 
         self.draw_scenario()
-        self.rocket.move(self.windX, self.windZ, verbose = verbose)
-        if self.rocket.locX < 0 or self.rocket.locX > WIDTH:
-            self.reset()
-        if self.ground_physics and self.rocket.locZ - fabs(cos(self.rocket.theta))*ROCKET_HEIGHT/2 < 0:
-            self.rocket.locZ = fabs(cos(self.rocket.theta))*ROCKET_HEIGHT/2
-            self.rocket.speedZ = 0
+        self.rocket = step_world(self.rocket, self.windX, self.windZ, self.ground_physics)
         pygame.display.flip()
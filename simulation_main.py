@@ -2,18 +2,21 @@ from constants import *
 from utils import Params, Response
 from simulation import Simulation
 from control import FullPIDController, FullPDController
-import matplotlib.pyplot as plt
+from plotting import PlotWorker
+from telemetry import TelemetryBuffer, TelemetryExporter, open_sink
 import pygame
 import sys
 
 # This file is responsible to perform the simulation of a specified controller
 # The parameters are defined at the end of the file, and the 'main' function
-# performs the simulation and also plots the graphs of it
+# performs the simulation and also plots the graphs of it (in background, see plotting.py)
 # 
 
-def main(params: Params) -> Response:
+def main(params: Params, plotter: PlotWorker = None, telemetry: TelemetryBuffer = None) -> Response:
     """Performs a simulation controlled by the user,
-    so the rocket dynamics can be tested and explored"""
+    so the rocket dynamics can be tested and explored.
+    The graphs are drawn by the given plotter, or by a new one, and the
+    state of the rocket is pushed to the telemetry buffer, if given"""
     XR = WIDTH/2 + 20   # Horizontal Position of reference
     Z_input = 100       # Vertical Parameter of reference (it can be, speed or position, based on SPEED_CTRL)
     max_time = 50  # in seconds
@@ -39,7 +42,9 @@ def main(params: Params) -> Response:
         sim.setWind(windX, windZ)
         t = sim.rocket.applyCommand(Z_input, XR, windX, windZ)
         sim.add_reference_point(XR, sim.rocket.locZ)
-        sim.update(verbose = False)
+        sim.update()
+        if telemetry is not None:
+            telemetry.push(sim.rocket, time)
         
         resp.theta_r.append(t)
         resp.alpha.append(sim.rocket.nozzleAngle)
@@ -60,57 +65,12 @@ def main(params: Params) -> Response:
         if time > max_time:
             run = False
 
-# Sample data (replace with actual data)
-    t = [i*D_TIME for i in range(len(resp.x))]  # Time
-
-    plt.figure(figsize=(6, 10))
-# Plot 1: x_r and x vs t
-    plt.subplot(3, 1, 1)
-    plt.plot(t, resp.x_r, label="x_r", color="red")
-    plt.plot(t, resp.x, label="x", color="blue")
-    plt.ylabel("X Position (m)")
-    plt.legend()
-    plt.grid()
-
-# Plot 2: theta_r and theta vs t
-    plt.subplot(3, 1, 2)
-    plt.plot(t, resp.theta_r, label="theta_r", color="red")
-    plt.plot(t, resp.theta, label="theta", color="blue")
-    plt.ylabel("Orientation (radians)")
-    plt.legend()
-    plt.grid()
-
-# Plot 3: alpha vs t
-    plt.subplot(3, 1, 3)
-    plt.plot(t, resp.alpha, label="Alpha", color="black")
-    plt.xlabel("Time (s)")
-    plt.ylabel("Alpha (radians)")
-    plt.grid()
-# Adjust layout and show the plots
-    plt.tight_layout()
-    plt.savefig('output/x.eps', format='eps')
-    plt.show()
-
-# Plot 1: z vs t
-    plt.figure(figsize=(6, 10))
-    label = "Z speed" if SPEED_CTRL else "Z position"
-    plt.subplot(2, 1, 1)
-    plt.plot(t, resp.z, label=label, color = "blue")
-    plt.plot(t, resp.z_r, label="Reference" + label, color = 'red')
-    plt.title(label)
-    plt.ylabel("Z speed (m/s)" if SPEED_CTRL else "Z position (m)")
-    plt.grid()
-
-# Plot 2: thrust vs t
-    plt.subplot(2, 1, 2)
-    plt.plot(t, resp.thrust, label="Thrust", color="black")
-    plt.xlabel("Time (s)")
-    plt.ylabel("Thrust (N)")
-    plt.grid()
-# Adjust layout and show the plots
-    plt.tight_layout()
-    plt.savefig('output/z.eps', format='eps')
-    plt.show()
+    own_plotter = plotter is None
+    if own_plotter:
+        plotter = PlotWorker()
+    plotter.submit(resp, 'output/x', 'output/z', SPEED_CTRL)
+    if own_plotter:
+        plotter.close(wait = False)
 
     return resp
 
@@ -120,5 +80,14 @@ if __name__ == "__main__":
     params = Params(xi_x = 1, omega_x = 10,
                     xi_theta = 0.8, omega_theta = 10,
                     xi_z = 0.8, omega_z = 1, k_z = 7)
-    main(params)
+    # Optional argument: telemetry target (a .csv or .jsonl file, or udp://host:port)
+    plotter = PlotWorker()
+    if len(sys.argv) > 1:
+        telemetry = TelemetryBuffer(decimation = 2)
+        exporter = TelemetryExporter(telemetry, open_sink(sys.argv[1])).start()
+        main(params, plotter = plotter, telemetry = telemetry)
+        exporter.stop()
+    else:
+        main(params, plotter = plotter)
+    plotter.close()  # the graphs are drawn before exiting
     sys.exit()
@@ -0,0 +1,50 @@
+from constants import WORKER_STARTUP_BUDGET
+
+import os
+import subprocess
+import sys
+
+# This file measures the time a fresh worker process takes to import the modules it needs
+# to simulate, and checks that it stays under the budget and that no plotting, graphics
+# or optimizer library is imported on the way (they must be imported lazily).
+
+WORKER_MODULES = ("constants", "utils", "control", "rocket", "world", "graphs_main")
+HEAVY_MODULES = ("pygame", "matplotlib", "cmaes", "numpy")
+
+_PROBE = """
+import sys, time
+start = time.perf_counter()
+for module in {modules!r}:
+    __import__(module)
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(" ".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def measure_startup(modules = WORKER_MODULES, repeat: int = 5) -> tuple:
+    """Imports the modules in fresh interpreters, as a spawned worker would do.
+    :return: best import time (in seconds) and the heavy modules that got imported"""
+    probe = _PROBE.format(modules=tuple(modules), heavy=HEAVY_MODULES)
+    best = None
+    heavy = []
+    for _ in range(repeat):
+        # run from the directory of the modules, so they are importable from any cwd
+        output = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split("\n")
+        elapsed = float(output[0])
+        best = elapsed if best is None else min(best, elapsed)
+        heavy = output[1].split()
+    return best, heavy
+
+
+def check_startup(modules = WORKER_MODULES, budget: float = WORKER_STARTUP_BUDGET) -> bool:
+    elapsed, heavy = measure_startup(modules)
+    print(f"worker import time: {elapsed*1000:.1f} ms (budget {budget*1000:.0f} ms)")
+    if heavy:
+        print("heavy modules imported: " + ", ".join(heavy))
+    return elapsed <= budget and not heavy
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_startup() else 1)
@@ -0,0 +1,97 @@
+import numpy as np
+
+# This file reduces the number of simulations of the CMAes search with a surrogate model:
+# a Gaussian process fitted on the parameters already simulated and their costs. At each
+# generation, the candidates given by the optimizer are ranked by the model, and only the
+# most promising (or uncertain) ones are really simulated; the others receive the cost
+# predicted by the model.
+
+LENGTH_SCALE = 0.2   # kernel length, in units of the (normalised) parameter ranges
+NOISE = 1e-6         # regularization of the kernel matrix
+MAX_POINTS = 300     # maximum number of simulated points used to fit the model
+EXPLORATION = 1.0    # weight of the uncertainty in the ranking (lower confidence bound)
+FAILED_COST = 1e30   # cost told to the optimizer for the simulations without a finite cost
+
+
+class GaussianProcess:
+    """Gaussian process regression with a squared exponential kernel.
+    Inputs are given normalised to [0, 1] and targets are standardised internally"""
+    def __init__(self, length_scale: float = LENGTH_SCALE, noise: float = NOISE):
+        self.length_scale = length_scale
+        self.noise = noise
+
+    def kernel(self, A, B):
+        distances = ((A[:, None, :] - B[None, :, :])**2).sum(axis=2)
+        return np.exp(-distances / (2 * self.length_scale**2))
+
+    def fit(self, X, y):
+        self.X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        self.mean = y.mean()
+        self.scale = y.std() or 1.0
+        K = self.kernel(self.X, self.X) + self.noise * np.eye(len(self.X))
+        self.L = np.linalg.cholesky(K)
+        self.alpha = np.linalg.solve(self.L.T, np.linalg.solve(self.L, (y - self.mean) / self.scale))
+        return self
+
+    def predict(self, X) -> tuple:
+        """:return: predicted mean and standard deviation of each point"""
+        Ks = self.kernel(np.asarray(X, dtype=float), self.X)
+        mu = Ks @ self.alpha
+        v = np.linalg.solve(self.L, Ks.T)
+        var = np.clip(1 - (v**2).sum(axis=0), 0, None)
+        return self.mean + self.scale * mu, self.scale * np.sqrt(var)
+
+
+def surrogate_search(cost_function, initial, bounds, generations: int = 100,
+                     evaluated_fraction: float = 0.3, min_points: int = 20, sigma: float = 1.3) -> tuple:
+    """CMAes search in which only a fraction of each generation is simulated.
+    The model is fitted on the logarithm of the cost, which is smoother. The points without
+    a finite cost are left out of the model (they would make all its predictions NaN)
+    and the optimizer receives FAILED_COST for them.
+    :param cost_function: function of the parameter vector returning its (simulated) cost
+    :return: best simulated parameters, their cost, the number of simulations
+             and the number of simulations saved"""
+    from cmaes import CMA
+    bounds = np.asarray(bounds, dtype=float)
+    low, span = bounds[:, 0], bounds[:, 1] - bounds[:, 0]
+    opt = CMA(mean = np.asarray(initial, dtype=float), bounds = bounds, sigma = sigma)
+    model = GaussianProcess()
+
+    X, y = [], []  # simulated points (normalised) and log of their costs
+    best_x, best_cost = None, np.inf
+    simulations = saved = 0
+
+    for generation in range(generations):
+        candidates = np.array([opt.ask() for _ in range(opt.population_size)])
+        normalised = (candidates - low) / span
+
+        if len(X) >= min_points:
+            model.fit(X[-MAX_POINTS:], y[-MAX_POINTS:])
+            mean, std = model.predict(normalised)
+            n_evaluated = max(1, int(round(evaluated_fraction * len(candidates))))
+            chosen = set(np.argsort(mean - EXPLORATION * std)[:n_evaluated].tolist())
+        else:
+            mean = None
+            chosen = set(range(len(candidates)))
+
+        solutions = []
+        for i, x in enumerate(candidates):
+            if i in chosen:
+                value = cost_function(x)
+                simulations += 1
+                if not np.isfinite(value):
+                    value = FAILED_COST
+                else:
+                    X.append(normalised[i])
+                    y.append(np.log1p(value))
+                if value < best_cost:
+                    best_x, best_cost = x, value
+            else:
+                value = min(np.expm1(mean[i]), FAILED_COST)
+                saved += 1
+            solutions.append((x, value))
+        opt.tell(solutions)
+        print(f"#{generation} best = {best_cost:.2f}, simulations = {simulations}, saved = {saved}")
+
+    return best_x, best_cost, simulations, saved
@@ -0,0 +1,181 @@
+from constants import FREQUENCY
+from utils import Params, PARAM_FIELDS
+import graphs_main
+
+from math import isfinite
+import multiprocessing
+import os
+import random
+import sys
+
+# This file sweeps grids of controller parameters (and wind) to map the regions where the
+# closed loop is stable. The points are simulated in parallel by worker processes and the
+# results are appended to a columnar store (one array per column, in .npz chunks), indexed
+# by the point coordinates, so points that are already computed are never simulated again.
+
+AXES = PARAM_FIELDS + ("windX", "windZ")
+RESULTS = ("cost", "x_error", "z_error", "stable")
+COLUMNS = AXES + RESULTS
+
+# Point used for the coordinates that are not swept
+DEFAULT_POINT = {"xi_x": 1, "omega_x": 10, "xi_theta": 0.8, "omega_theta": 10,
+                 "xi_z": 0.8, "omega_z": 1, "k_z": 7, "windX": 0, "windZ": 0}
+
+STABLE_WINDOW = 5 * FREQUENCY  # last samples in which the response must have settled
+STABLE_TOLERANCE = 2           # maximum error (in m) allowed in that window
+
+
+def cartesian(axes: dict, base: dict = DEFAULT_POINT) -> list:
+    """Full grid design: every combination of the values given for each axis"""
+    points = [dict(base)]
+    for axis, values in axes.items():
+        points = [{**point, axis: float(value)} for point in points for value in values]
+    return points
+
+
+def latin_hypercube(bounds: dict, n: int, seed: int = 0, base: dict = DEFAULT_POINT) -> list:
+    """Latin hypercube design: n points in which every axis range, divided in n
+    intervals, has exactly one point in each interval"""
+    rng = random.Random(seed)
+    points = [dict(base) for _ in range(n)]
+    for axis, (low, high) in bounds.items():
+        strata = list(range(n))
+        rng.shuffle(strata)
+        for point, stratum in zip(points, strata):
+            point[axis] = low + (stratum + rng.random()) * (high - low) / n
+    return points
+
+
+def point_key(point: dict) -> tuple:
+    return tuple(round(float(point[axis]), 9) for axis in AXES)
+
+
+def evaluate(point: dict) -> dict:
+    """Simulates a point and classifies its response as stable or not"""
+    params = Params(*(point[field] for field in PARAM_FIELDS))
+    resp = graphs_main.main(params, plot = False, windX = point["windX"], windZ = point["windZ"],
+                            events = graphs_main.DIVERGENCE)
+    value = graphs_main.cost(resp.x + resp.z, resp.x_r + resp.z_r)
+    x_error = max(abs(x - xr) for x, xr in zip(resp.x[-STABLE_WINDOW:], resp.x_r[-STABLE_WINDOW:]))
+    z_error = max(abs(z - zr) for z, zr in zip(resp.z[-STABLE_WINDOW:], resp.z_r[-STABLE_WINDOW:]))
+    stable = isfinite(value) and x_error < STABLE_TOLERANCE and z_error < STABLE_TOLERANCE
+    return {**{axis: point[axis] for axis in AXES},
+            "cost": value, "x_error": x_error, "z_error": z_error, "stable": stable}
+
+
+def _evaluate_shard(points: list) -> list:
+    return [evaluate(point) for point in points]
+
+
+class ResultStore:
+    """Columnar store of sweep results. Each append writes a new chunk file,
+    so the results of a sweep interrupted in the middle are not lost"""
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.chunks = sorted(name for name in os.listdir(path) if name.endswith(".npz"))
+        self.index = {}  # point key -> (chunk number, row)
+        for number, name in enumerate(self.chunks):
+            self._index_chunk(number, self._load(name))
+
+    def _load(self, name: str) -> dict:
+        import numpy as np
+        with np.load(os.path.join(self.path, name)) as data:
+            return {column: data[column] for column in COLUMNS}
+
+    def _index_chunk(self, number: int, columns: dict):
+        for row in range(len(columns[AXES[0]])):
+            self.index[point_key({axis: columns[axis][row] for axis in AXES})] = (number, row)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, point: dict):
+        return point_key(point) in self.index
+
+    def append(self, rows: list):
+        import numpy as np
+        if not rows:
+            return
+        columns = {column: np.array([row[column] for row in rows]) for column in COLUMNS}
+        name = f"chunk-{len(self.chunks):06d}.npz"
+        path = os.path.join(self.path, name)
+        with open(path + ".tmp", "wb") as file:
+            np.savez(file, **columns)
+        os.replace(path + ".tmp", path)
+        self._index_chunk(len(self.chunks), columns)
+        self.chunks.append(name)
+
+    def columns(self) -> dict:
+        """All the stored results, as one array per column"""
+        import numpy as np
+        chunks = [self._load(name) for name in self.chunks]
+        if not chunks:
+            return {column: np.array([]) for column in COLUMNS}
+        return {column: np.concatenate([chunk[column] for chunk in chunks]) for column in COLUMNS}
+
+    def rows(self) -> list:
+        columns = self.columns()
+        return [{column: columns[column][i].item() for column in COLUMNS}
+                for i in range(len(columns[COLUMNS[0]]))]
+
+
+def run_sweep(points: list, store: ResultStore, processes: int = None, shard_size: int = 16) -> int:
+    """Simulates (in parallel) the points that are not in the store yet
+    :return: number of simulated points"""
+    pending, keys = [], set()
+    for point in points:
+        key = point_key(point)
+        if key not in store.index and key not in keys:
+            keys.add(key)
+            pending.append(point)
+    shards = [pending[i:i + shard_size] for i in range(0, len(pending), shard_size)]
+    if not shards:
+        return 0
+
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes) as pool:
+        for rows in pool.imap_unordered(_evaluate_shard, shards):
+            store.append(rows)
+    return len(pending)
+
+
+def boundary_points(rows: list, axes: list) -> list:
+    """Midpoints between neighbouring points (along one of the swept axes)
+    whose responses are classified differently (stable and unstable)"""
+    points = []
+    for axis in axes:
+        lines = {}
+        for row in rows:
+            other = tuple((a, row[a]) for a in AXES if a != axis)
+            lines.setdefault(other, []).append(row)
+        for line in lines.values():
+            line.sort(key=lambda row: row[axis])
+            for a, b in zip(line, line[1:]):
+                if a["stable"] != b["stable"]:
+                    points.append({**{c: a[c] for c in AXES}, axis: (a[axis] + b[axis]) / 2})
+    return points
+
+
+def refine(store: ResultStore, axes: list, levels: int = 3, processes: int = None) -> int:
+    """Progressive refinement: simulates, for a number of levels, the midpoints
+    between the points of the store where the outcome flips
+    :return: number of simulated points"""
+    total = 0
+    for _ in range(levels):
+        simulated = run_sweep(boundary_points(store.rows(), axes), store, processes)
+        if simulated == 0:
+            break
+        total += simulated
+    return total
+
+
+if __name__ == "__main__":
+    # Usage: python sweep.py <store directory>
+    store = ResultStore(sys.argv[1] if len(sys.argv) > 1 else "output/sweep")
+    axes = {"omega_x": [2, 5, 10, 20, 40], "xi_theta": [0.2, 0.4, 0.6, 0.8, 1], "windX": [-5, 0, 5]}
+    simulated = run_sweep(cartesian(axes), store)
+    simulated += refine(store, ["omega_x", "xi_theta"])
+    stable = sum(row["stable"] for row in store.rows())
+    print(f"{simulated} points simulated, {len(store)} stored ({stable} stable)")
+    sys.exit()
@@ -0,0 +1,153 @@
+from array import array
+from typing import TYPE_CHECKING
+import json
+import socket
+import threading
+
+if TYPE_CHECKING:
+    from rocket import Rocket
+
+# This file exports the state of the rocket while a simulation runs. The simulation loop
+# (single producer) only copies a few floats into a preallocated ring buffer, and a
+# consumer thread periodically takes the new samples and writes them in batches to a
+# CSV/JSONL file or sends them to a UDP socket, so monitoring does not slow the loop.
+
+FIELDS = ("time", "locX", "locZ", "theta", "nozzleAngle", "thrust", "speedX", "speedZ", "omega")
+CAPACITY = 4096        # samples kept in the ring buffer
+EXPORT_INTERVAL = 0.2  # seconds between two exported batches
+MAX_DATAGRAM = 8192    # bytes of JSON lines per UDP datagram
+
+
+class TelemetryBuffer:
+    """Single producer / single consumer ring buffer of state samples.
+    The producer writes the sample and only then publishes it by incrementing
+    'written', and the consumer only reads published samples, so no lock is needed.
+    If the consumer falls behind by more than the capacity, the oldest samples are lost
+    (and counted in 'dropped'), including the ones that may be overwritten while copied.
+    The buffer has one more slot than its capacity, for the sample being written"""
+    def __init__(self, capacity: int = CAPACITY, decimation: int = 1):
+        self.capacity = capacity
+        self.slots = capacity + 1
+        self.decimation = decimation  # only one sample every 'decimation' pushes is kept
+        self.data = array("d", bytes(8 * self.slots * len(FIELDS)))
+        self.written = 0
+        self.read = 0
+        self.dropped = 0
+        self.pushes = 0
+
+    def push(self, rocket: "Rocket", time: float):
+        """Stores the state of the rocket (called by the producer)"""
+        self.pushes += 1
+        if self.pushes % self.decimation:
+            return
+        n = len(FIELDS)
+        i = (self.written % self.slots) * n
+        self.data[i:i + n] = array("d", (time, rocket.locX, rocket.locZ, rocket.theta, rocket.nozzleAngle,
+                                         rocket.thrust, rocket.speedX, rocket.speedZ, rocket.omega))
+        self.written += 1
+
+    def drain(self) -> list:
+        """Takes the published samples that were not read yet (called by the consumer)"""
+        written = self.written
+        if written - self.read > self.capacity:
+            self.dropped += written - self.read - self.capacity
+            self.read = written - self.capacity
+        n = len(FIELDS)
+        samples = []
+        for k in range(self.read, written):
+            i = (k % self.slots) * n
+            samples.append(tuple(self.data[i:i + n]))
+        # The producer overwrites the slot of sample k before publishing sample k + slots, so
+        # the samples before (last written) - capacity may have changed during the copy
+        lapped = min(self.written - self.capacity - self.read, len(samples))
+        if lapped > 0:
+            self.dropped += lapped
+            samples = samples[lapped:]
+        self.read = written
+        return samples
+
+
+class CsvSink:
+    def __init__(self, path: str):
+        self.file = open(path, "w")
+        self.file.write(",".join(FIELDS) + "\n")
+
+    def write(self, samples: list):
+        self.file.write("".join(",".join(map(repr, sample)) + "\n" for sample in samples))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class JsonlSink:
+    def __init__(self, path: str):
+        self.file = open(path, "w")
+
+    def write(self, samples: list):
+        self.file.write("".join(json.dumps(dict(zip(FIELDS, sample))) + "\n" for sample in samples))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class UdpSink:
+    """Sends the samples as JSON lines, packed in datagrams of limited size"""
+    def __init__(self, host: str = "127.0.0.1", port: int = 9870):
+        self.address = (host, port)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def write(self, samples: list):
+        datagram = b""
+        for sample in samples:
+            line = (json.dumps(dict(zip(FIELDS, sample))) + "\n").encode()
+            if datagram and len(datagram) + len(line) > MAX_DATAGRAM:
+                self.socket.sendto(datagram, self.address)
+                datagram = b""
+            datagram += line
+        if datagram:
+            self.socket.sendto(datagram, self.address)
+
+    def close(self):
+        self.socket.close()
+
+
+def open_sink(target: str):
+    """Creates the sink of a target: 'udp://host:port', a .jsonl file or a .csv file"""
+    if target.startswith("udp://"):
+        host, port = target[len("udp://"):].rsplit(":", 1)
+        return UdpSink(host, int(port))
+    if target.endswith(".jsonl"):
+        return JsonlSink(target)
+    return CsvSink(target)
+
+
+class TelemetryExporter:
+    """Consumer thread that exports the samples of a buffer in batches"""
+    def __init__(self, buffer: TelemetryBuffer, sink, interval: float = EXPORT_INTERVAL):
+        self.buffer = buffer
+        self.sink = sink
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.export()
+        self.export()
+
+    def export(self):
+        samples = self.buffer.drain()
+        if samples:
+            self.sink.write(samples)
+
+    def stop(self):
+        """Exports the remaining samples and closes the sink"""
+        self.stopped.set()
+        self.thread.join()
+        self.sink.close()
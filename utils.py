@@ -12,6 +12,8 @@ class Params:
         self.omega_z = omega_z
         self.k_z = k_z
 
+PARAM_FIELDS = ("xi_x", "omega_x", "xi_theta", "omega_theta", "xi_z", "omega_z", "k_z") # fields of Params
+
 class Response:
     def __init__(self):
         self.theta = []
@@ -23,6 +25,8 @@ class Response:
         self.thrust = []
         self.alpha = []
 
+SIGNALS = ("x", "x_r", "z", "z_r", "theta", "theta_r", "alpha", "thrust") # signals of Response
+
 def sgn(x: float|int) -> int:
     """Function that returns the sign of a number. Notice that there is a threshold of eps
     :param x: number to be analyzed
@@ -0,0 +1,26 @@
+from constants import WIDTH, ROCKET_HEIGHT
+from rocket import Rocket
+from events import WorldEvents, GroundContact, Bounds
+
+# Headless rules of the simulated world (boundaries and ground), shared by the
+# rendered simulation and by the replay of recorded sessions
+
+WORLD_EVENTS = WorldEvents(ground = GroundContact(), bounds = Bounds())
+NO_GROUND_EVENTS = WorldEvents(bounds = Bounds())
+
+
+def spawn_rocket(on_ground: bool = True) -> Rocket:
+    """Creates the rocket at the middle of the world, as done when the
+    simulation starts (on_ground = False) or is reset (on_ground = True)"""
+    if on_ground:
+        return Rocket(locX=WIDTH/2, locZ=ROCKET_HEIGHT/2)
+    return Rocket(locX=WIDTH/2)
+
+
+def step_world(rocket: Rocket, windX: float, windZ: float, ground_physics: bool = True) -> Rocket:
+    """Moves the rocket one sample time and applies the world rules to it.
+    :return: the rocket that remains in the world (a new one if it left the bounds)"""
+    rocket.move(windX, windZ, WORLD_EVENTS if ground_physics else NO_GROUND_EVENTS)
+    if rocket.terminated:
+        return spawn_rocket()
+    return rocket